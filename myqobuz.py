@@ -21,6 +21,11 @@ from argparse import ArgumentParser, RawDescriptionHelpFormatter
 from datetime import datetime, timedelta
 import json
 import re
+import time
+import cProfile
+import tracemalloc
+import contextlib
+import inspect
 import requests
 
 # read config file for login and preferences
@@ -40,6 +45,165 @@ import qobuz
 
 
 
+class StageProfiler():
+    '''
+    Wall-clock time and peak memory per pipeline stage :
+        login, read (source files), fetch (qobuz requests), parse (qobuz objects construction),
+        render, download (covers), update (playlists and favorites changes)
+
+    Stages may be nested : time and memory spent in an inner stage are not counted in the outer one.
+    Every qobuz request is a "fetch" stage, including the lazy ones made by qobuz objects while rendering.
+    When memory is traced, tracing is restarted at each stage boundary (nested or not) : the snapshot
+    taken at the next boundary holds only the blocks allocated since, still alive, and they are charged
+    to the innermost stage. Likewise, peak memory is the peak of memory allocated during the stage.
+    '''
+    STAGES = ('login', 'read', 'fetch', 'parse', 'render', 'download', 'update')
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.stats = dict()
+        self.allocs = dict()
+        self._stack = list()
+        self._profile = None
+        self._start = None
+        self._overhead = 0.0
+        self._ignored_files = set()
+        self._own_lines = range(0)
+
+    def start(self, trace_memory=False, profile=None):
+        '''
+        enable stages measurement, and memory tracing if requested
+
+        profile: cProfile.Profile object, disabled while taking snapshots
+        '''
+        self.enabled = True
+        if trace_memory and tracemalloc.is_tracing():
+            # tracing is restarted at each stage boundary, don't discard the running one
+            print('WARNING: tracemalloc is already tracing (PYTHONTRACEMALLOC ?), memory is not profiled', file=sys.stderr)
+            trace_memory = False
+        self.trace_memory = trace_memory
+        self._profile = profile
+        if trace_memory:
+            # ignore allocations of tracemalloc, contextlib and the profiler itself
+            self._ignored_files = {tracemalloc.__file__, contextlib.__file__, '<frozen importlib._bootstrap>', '<unknown>'}
+            lines, first = inspect.getsourcelines(StageProfiler)
+            self._own_lines = range(first, first + len(lines))
+            tracemalloc.start()
+        self._start = time.perf_counter()
+
+    def wrap(self, name, func):
+        '''
+        returns func measured as a stage
+        '''
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''
+        context manager measuring a stage
+        '''
+        if not self.enabled:
+            yield
+            return
+        self._charge()
+        self._boundary()
+        self._stack.append([name, time.perf_counter()])
+        try:
+            yield
+        finally:
+            self._charge()
+            self._boundary()
+            self._stack.pop()
+            self.stats[name]['calls'] += 1
+            if self._stack:
+                # resume outer stage
+                self._stack[-1][1] = time.perf_counter()
+
+    def _charge(self):
+        '''
+        charge elapsed time and peak memory to the current stage
+        '''
+        if not self._stack:
+            return
+        name, start = self._stack[-1]
+        stat = self.stats.setdefault(name, {'calls': 0, 'time': 0.0, 'peak': 0})
+        stat['time'] += time.perf_counter() - start
+        if self.trace_memory:
+            stat['peak'] = max(stat['peak'], tracemalloc.get_traced_memory()[1])
+
+    def _boundary(self):
+        '''
+        at stage boundary, charge blocks allocated since the previous boundary to the current stage,
+        and restart memory tracing
+        '''
+        if not self.trace_memory:
+            return
+        if self._profile:
+            self._profile.disable()
+        start = time.perf_counter()
+        snapshot = tracemalloc.take_snapshot()
+        # group traces with tracing stopped, it's much faster
+        tracemalloc.stop()
+        if self._stack:
+            self._add_allocs(self._stack[-1][0], snapshot)
+        del snapshot
+        self._overhead += time.perf_counter() - start
+        tracemalloc.start()
+        if self._profile:
+            self._profile.enable()
+
+    def _add_allocs(self, name, snapshot):
+        '''
+        accumulate allocations by stage
+        '''
+        allocs = self.allocs.setdefault(name, dict())
+        for stat in snapshot.statistics('lineno'):
+            frame = stat.traceback[0]
+            if frame.filename in self._ignored_files:
+                continue
+            if frame.filename == __file__ and frame.lineno in self._own_lines:
+                continue
+            size, count = allocs.get(stat.traceback, (0, 0))
+            allocs[stat.traceback] = (size + stat.size, count + stat.count)
+
+    def report(self, top=10, file=sys.stderr):
+        '''
+        print stages table and top allocation sites
+        '''
+        names = [n for n in self.STAGES if n in self.stats] + [n for n in self.stats if n not in self.STAGES]
+        print('Profile by stage', file=file)
+        fmt = '    %-10s | %6s | %10s | %12s'
+        print_header(fmt, ('Stage', 'Calls', 'Time (s)', 'Peak memory'), file=file)
+        for name in names:
+            stat = self.stats[name]
+            peak = size_tostring(stat['peak']) if self.trace_memory else '-'
+            print(fmt % (name, stat['calls'], '%.3f' % stat['time'], peak), file=file)
+        if self.trace_memory:
+            print(fmt % ('snapshots', '', '%.3f' % self._overhead, ''), file=file)
+        print(fmt % ('total', '', '%.3f' % (time.perf_counter() - self._start), ''), file=file)
+        print(file=file)
+        if not self.trace_memory:
+            return
+        print('Top allocation sites by stage', file=file)
+        fmt = '    %-10s | %12s | %8s | %s'
+        print_header(fmt, ('Stage', 'Size', 'Blocks', 'Location'), file=file)
+        for name in names:
+            allocs = sorted(self.allocs.get(name, dict()).items(), key=lambda x: x[1][0], reverse=True)
+            for traceback, (size, count) in allocs[:top]:
+                frame = traceback[0]
+                print(fmt % (name, size_tostring(size), count, '{}:{}'.format(frame.filename, frame.lineno)), file=file)
+        print(file=file)
+
+
+# stages profiler, enabled with option --profile or --profile-memory
+PROFILER = StageProfiler()
+
+
+
 def seconds_tostring(seconds):
     '''
     convert seconds to string
@@ -54,6 +218,17 @@ def seconds_tostring(seconds):
     return ''.join(stime)
 
 
+def size_tostring(size):
+    '''
+    convert bytes size to human readable string
+    '''
+    for unit in ['B', 'KiB', 'MiB']:
+        if abs(size) < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GiB'.format(size)
+
+
 def timestamp_tostring(timestamp, fmt='%d/%m/%Y'):
     '''
     convert timestamp (negative or not) to date string
@@ -64,15 +239,15 @@ def timestamp_tostring(timestamp, fmt='%d/%m/%Y'):
         return datetime.fromtimestamp(timestamp).strftime(fmt)
 
 
-def print_header(fmt, elements):
+def print_header(fmt, elements, file=None):
     '''
     print header for table
     '''
     #print('Favorites Albums')
     header = fmt % elements
-    print(len(header) * '=')
-    print(header)
-    print(len(header) * '=')
+    print(len(header) * '=', file=file)
+    print(header, file=file)
+    print(len(header) * '=', file=file)
 
 
 
@@ -113,8 +288,9 @@ def download_album_image(album):
     filename = '{}\\{}'.format(MYCONFIG['album']['cover_dir'], filename)
     if os.path.exists(filename):
         return
-    resp = requests.get(album.images[MYCONFIG['album']['cover_size']], allow_redirects=True)
-    open(filename, 'wb').write(resp.content)
+    with PROFILER.stage('download'):
+        resp = requests.get(album.images[MYCONFIG['album']['cover_size']], allow_redirects=True)
+        open(filename, 'wb').write(resp.content)
 
 
 def get_user_playlists(user, ptype, raw=False):
@@ -128,19 +304,20 @@ def get_user_playlists(user, ptype, raw=False):
     limit = 50
     offset = 0
     playlists = list()
-    while True:
-        pls = user.playlists_get(filter=ptype, limit=limit, offset=offset)
-        if raw:
-            if len(pls["playlists"]["items"]) == 0:
+    with PROFILER.stage('parse'):
+        while True:
+            pls = user.playlists_get(filter=ptype, limit=limit, offset=offset)
+            if raw:
+                if len(pls["playlists"]["items"]) == 0:
+                    break
+                playlists.append(pls["playlists"])
+                offset += limit
+                continue
+            if not pls:
                 break
-            playlists.append(pls["playlists"])
-            offset += limit
-            continue
-        if not pls:
-            break
 
-        playlists += pls
-        offset += limit
+            playlists += pls
+            offset += limit
     return playlists
 
 
@@ -160,18 +337,19 @@ def get_user_favorites(user, fav_type, raw=False):
     limit = 50
     offset = 0
     favorites = list()
-    while True:
-        favs = user.favorites_get(fav_type=fav_type, limit=limit, offset=offset)
-        if raw:
-            if len(favs[fav_type]["items"]) == 0:
-                break
-            for _f in favs[fav_type]["items"]:
-                favorites.append(_f)
-        else:
-            if not favs:
-                break
-            favorites += favs
-        offset += limit
+    with PROFILER.stage('parse'):
+        while True:
+            favs = user.favorites_get(fav_type=fav_type, limit=limit, offset=offset)
+            if raw:
+                if len(favs[fav_type]["items"]) == 0:
+                    break
+                for _f in favs[fav_type]["items"]:
+                    favorites.append(_f)
+            else:
+                if not favs:
+                    break
+                favorites += favs
+            offset += limit
     return favorites
 
 
@@ -187,18 +365,19 @@ def get_all_tracks(playlist, raw=False):
     limit = 50
     offset = 0
     tracks = list()
-    while True:
-        trks = playlist.get_tracks(limit=limit, offset=offset, raw=raw)
-        if raw:
-            if len(trks["tracks"]["items"]) == 0:
-                break
-            for _t in trks["tracks"]["items"]:
-                tracks.append(_t)
-        else:
-            if not trks:
-                break
-            tracks += trks
-        offset += limit
+    with PROFILER.stage('parse'):
+        while True:
+            trks = playlist.get_tracks(limit=limit, offset=offset, raw=raw)
+            if raw:
+                if len(trks["tracks"]["items"]) == 0:
+                    break
+                for _t in trks["tracks"]["items"]:
+                    tracks.append(_t)
+            else:
+                if not trks:
+                    break
+                tracks += trks
+            offset += limit
     return tracks
 
 
@@ -212,15 +391,17 @@ def qobuz_myplaylists(user, args, log):
         args.type = 'owner,subscriber'
     if args.raw:
         json_data = get_user_playlists(user, args.type, args.raw)
-        print(json.dumps(json_data, indent=4))
-        print()
+        with PROFILER.stage('render'):
+            print(json.dumps(json_data, indent=4))
+            print()
         for playlist in get_user_playlists(user, args.type):
             if args.name and args.name.lower() != playlist.name.lower():
                 log.info('skip playlist "%s"', playlist.name)
                 continue
             json_data = get_all_tracks(playlist, args.raw)
-            print(json.dumps(json_data, indent=4))
-            print()
+            with PROFILER.stage('render'):
+                print(json.dumps(json_data, indent=4))
+                print()
         log.info('... done')
         return
     playlists = get_user_playlists(user, args.type, args.raw)
@@ -231,9 +412,10 @@ def qobuz_myplaylists(user, args, log):
             log.info('skip playlist "%s"', playlist.name)
             continue
 
-        print('Playlist: "{}", description: "{}", public: {}, collaborative: {}, duration: {}, {} tracks, update date: {}, id: {}'.\
-            format(playlist.name, playlist.description, playlist.public, playlist.collaborative, \
-                seconds_tostring(playlist.duration), playlist.tracks_count, datetime.fromtimestamp(playlist.updated_at).strftime('%Y-%m-%d'), playlist.id))
+        with PROFILER.stage('render'):
+            print('Playlist: "{}", description: "{}", public: {}, collaborative: {}, duration: {}, {} tracks, update date: {}, id: {}'.\
+                format(playlist.name, playlist.description, playlist.public, playlist.collaborative, \
+                    seconds_tostring(playlist.duration), playlist.tracks_count, datetime.fromtimestamp(playlist.updated_at).strftime('%Y-%m-%d'), playlist.id))
 
         if args.no_tracks:
             continue
@@ -242,15 +424,16 @@ def qobuz_myplaylists(user, args, log):
         tracks = get_all_tracks(playlist)
 
         log.info('display playlist tracks...')
-        fmt = '    %8s | %-40s | %-50s | %-50s | %10s | %s'
-        print_header(fmt, ('#idTrack', 'Artist', 'Album', 'Title', 'Track', 'Duration'))
-        if args.sort:
-            tracks.sort(key=lambda x: x.artist.name + x.album.title)
-        for track in tracks:
-            print(fmt % (track.id, track.artist.name, track.album.title, track.title, '%s/%s' % (track.track_number, track.album.tracks_count), seconds_tostring(track.duration)))
-            if args.performers:
-                for performer in track.performers:
-                    print('        -> {}'.format(performer))
+        with PROFILER.stage('render'):
+            fmt = '    %8s | %-40s | %-50s | %-50s | %10s | %s'
+            print_header(fmt, ('#idTrack', 'Artist', 'Album', 'Title', 'Track', 'Duration'))
+            if args.sort:
+                tracks.sort(key=lambda x: x.artist.name + x.album.title)
+            for track in tracks:
+                print(fmt % (track.id, track.artist.name, track.album.title, track.title, '%s/%s' % (track.track_number, track.album.tracks_count), seconds_tostring(track.duration)))
+                if args.performers:
+                    for performer in track.performers:
+                        print('        -> {}'.format(performer))
         log.info('... done')
         print()
 
@@ -268,17 +451,19 @@ def qobuz_myfavorites(user, args, log):
         tracks = get_user_favorites(user, 'tracks', args.raw)
         log.info('... done')
         if args.raw:
-            print(json.dumps(tracks, indent=4))
+            with PROFILER.stage('render'):
+                print(json.dumps(tracks, indent=4))
         else:
-            tracks.sort(key=lambda x: x.artist.name + x.album.title)
-            for track in tracks:
-                log.info('display track')
-                print(fmt % (track.id, track.artist.name, track.album.title, track.title, '%s/%s' % (track.track_number, track.album.tracks_count), seconds_tostring(track.duration)))
-                if args.performers:
-                    for performer in track.performers:
-                        print('        -> {}'.format(performer))
-                if args.cover:
-                    download_album_image(track.album)
+            with PROFILER.stage('render'):
+                tracks.sort(key=lambda x: x.artist.name + x.album.title)
+                for track in tracks:
+                    log.info('display track')
+                    print(fmt % (track.id, track.artist.name, track.album.title, track.title, '%s/%s' % (track.track_number, track.album.tracks_count), seconds_tostring(track.duration)))
+                    if args.performers:
+                        for performer in track.performers:
+                            print('        -> {}'.format(performer))
+                    if args.cover:
+                        download_album_image(track.album)
             log.info('display done')
         print()
 
@@ -290,14 +475,16 @@ def qobuz_myfavorites(user, args, log):
         albums = get_user_favorites(user, 'albums', args.raw)
         log.info('... done')
         if args.raw:
-            print(json.dumps(albums, indent=4))
+            with PROFILER.stage('render'):
+                print(json.dumps(albums, indent=4))
         else:
-            albums.sort(key=lambda x: x.artist.name)
-            for album in albums:
-                log.info('display album')
-                print(fmt % (album.id, album.artist.name, album.title, '%s tracks' % album.tracks_count, timestamp_tostring(album.released_at)))
-                if args.cover:
-                    download_album_image(album)
+            with PROFILER.stage('render'):
+                albums.sort(key=lambda x: x.artist.name)
+                for album in albums:
+                    log.info('display album')
+                    print(fmt % (album.id, album.artist.name, album.title, '%s tracks' % album.tracks_count, timestamp_tostring(album.released_at)))
+                    if args.cover:
+                        download_album_image(album)
             log.info('display done')
         print()
 
@@ -309,12 +496,14 @@ def qobuz_myfavorites(user, args, log):
         artists = get_user_favorites(user, 'artists', args.raw)
         log.info('... done')
         if args.raw:
-            print(json.dumps(artists, indent=4))
+            with PROFILER.stage('render'):
+                print(json.dumps(artists, indent=4))
         else:
-            artists.sort(key=lambda x: x.name)
-            for artist in artists:
-                log.info('display artist')
-                print(fmt % (artist.id, artist.name, artist.albums_count))
+            with PROFILER.stage('render'):
+                artists.sort(key=lambda x: x.name)
+                for artist in artists:
+                    log.info('display artist')
+                    print(fmt % (artist.id, artist.name, artist.albums_count))
         print()
 
 
@@ -363,7 +552,8 @@ def qobuz_mod_playlist(user, action, args, log):
     else:
         fsource = sys.stdin
         print('Read source playlist(s) from stdin.')
-    new_playlists = _read_playlists_file(fsource)
+    with PROFILER.stage('read'):
+        new_playlists = _read_playlists_file(fsource)
     log.info('playlist file "%s" loaded', args.track_file)
 
     # Before creating a playlist we need to check if the name already exists.
@@ -391,13 +581,15 @@ def qobuz_mod_playlist(user, action, args, log):
         else:
             # create new playlist
             log.info('create new playlist "%s"', name)
-            id_playlist = user.playlist_create(name, new_playlist['description'], int(new_playlist['public']), int(new_playlist['collaborative'])).id
+            with PROFILER.stage('update'):
+                id_playlist = user.playlist_create(name, new_playlist['description'], int(new_playlist['public']), int(new_playlist['collaborative'])).id
 
         # track ids for current playlist. Warning :
         #   - Playlist.add_tracks uses list of Track.id
         #   - Playlist.del_tracks uses list of Track.playlist_track_id
         log.info('get current tracks for existing playlist')
-        playlist_work = qobuz.Playlist.from_id(id_playlist, user)
+        with PROFILER.stage('parse'):
+            playlist_work = qobuz.Playlist.from_id(id_playlist, user)
         current_tracks = {t.id:t.playlist_track_id for t in get_all_tracks(playlist_work)}
         log.info('... done')
 
@@ -410,7 +602,8 @@ def qobuz_mod_playlist(user, action, args, log):
             print('  number of tracks to add : {}'.format(len(tracks_to_add)))
             if tracks_to_add:
                 log.info('add tracks %s ...', tracks_to_add)
-                playlist_work.add_tracks(tracks_to_add, user)
+                with PROFILER.stage('update'):
+                    playlist_work.add_tracks(tracks_to_add, user)
             log.info('... done')
 
         elif local_action == 'del':
@@ -422,7 +615,8 @@ def qobuz_mod_playlist(user, action, args, log):
             print('  number of tracks to delete : {}'.format(len(tracks_to_del)))
             if tracks_to_del:
                 log.info('delete tracks %s ...', tracks_to_del)
-                playlist_work.del_tracks(tracks_to_del, user)
+                with PROFILER.stage('update'):
+                    playlist_work.del_tracks(tracks_to_del, user)
             log.info('... done')
 
         elif local_action == 'replace':
@@ -441,10 +635,12 @@ def qobuz_mod_playlist(user, action, args, log):
             print('  {} tracks to add, {} to delete'.format(len(tracks_to_add), (len(playlist_tracks_to_del))))
             if tracks_to_add:
                 log.info('add tracks %s ...', tracks_to_add)
-                playlist_work.add_tracks(tracks_to_add, user)
+                with PROFILER.stage('update'):
+                    playlist_work.add_tracks(tracks_to_add, user)
             if tracks_to_del:
                 log.info('delete tracks %s ...', tracks_to_del)
-                playlist_work.del_tracks(playlist_tracks_to_del, user)
+                with PROFILER.stage('update'):
+                    playlist_work.del_tracks(playlist_tracks_to_del, user)
             log.info('... done')
 
 
@@ -473,26 +669,28 @@ def qobuz_mod_favorites(user, action, args, log):
     re_idfav = re.compile(r'^ *([\d\w]+)')
     section = None
     favorites = {'Artists':list(), 'Albums':list(), 'Tracks':list()}
-    for line in fsource.readlines():
-        match = re_section.match(line)
-        if match:
-            if not match.group(1) in ['Artists', 'Albums', 'Tracks']:
-                print('ERROR : favorites section unkwown : "{}"'.format(match.group(1)))
-                return
-            section = match.group(1)
-            continue
-        match = re_idfav.match(line)
-        if match:
-            if not section:
-                print('ERROR : missing favorites section')
-            favorites[section].append(match.group(1))
+    with PROFILER.stage('read'):
+        for line in fsource.readlines():
+            match = re_section.match(line)
+            if match:
+                if not match.group(1) in ['Artists', 'Albums', 'Tracks']:
+                    print('ERROR : favorites section unkwown : "{}"'.format(match.group(1)))
+                    return
+                section = match.group(1)
+                continue
+            match = re_idfav.match(line)
+            if match:
+                if not section:
+                    print('ERROR : missing favorites section')
+                favorites[section].append(match.group(1))
     log.info('Favorites to %s : %s', action, favorites)
 
     result = False
-    if action == 'add':
-        result = user.favorites_add(albums=favorites['Albums'], tracks=favorites['Tracks'], artists=favorites['Artists'])
-    elif action == 'del':
-        result = user.favorites_del(albums=favorites['Albums'], tracks=favorites['Tracks'], artists=favorites['Artists'])
+    with PROFILER.stage('update'):
+        if action == 'add':
+            result = user.favorites_add(albums=favorites['Albums'], tracks=favorites['Tracks'], artists=favorites['Artists'])
+        elif action == 'del':
+            result = user.favorites_del(albums=favorites['Albums'], tracks=favorites['Tracks'], artists=favorites['Artists'])
     if result:
         print('  Favorites processed : Artists:{}, Albums:{}, Tracks:{}'.format(\
             len(favorites['Artists']), len(favorites['Albums']), len(favorites['Tracks'])))
@@ -503,6 +701,47 @@ def qobuz_mod_favorites(user, action, args, log):
 
 
 
+def run_command(args, log):
+    '''
+    Login and run the command
+    '''
+    if PROFILER.enabled:
+        # qobuz objects call api.request, also lazily when their attributes are read
+        qobuz.api.request = PROFILER.wrap('fetch', qobuz.api.request)
+
+    with PROFILER.stage('login'):
+        # register qobuz app
+        qobuz.api.register_app(MYCONFIG['login']['app_id'], MYCONFIG['login']['app_secret'])
+
+        # prepare qobuz authentification
+        log.info('login...')
+        user = qobuz.User(MYCONFIG['login']['email'], MYCONFIG['login']['password'])
+        log.info('... done')
+
+
+    if args.command == 'favorites':
+        qobuz_myfavorites(user, args, log)
+
+    elif args.command == 'favorites-add':
+        qobuz_mod_favorites(user, 'add', args, log)
+
+    elif args.command == 'favorites-del':
+        qobuz_mod_favorites(user, 'del', args, log)
+
+    elif args.command == 'playlists':
+        qobuz_myplaylists(user, args, log)
+
+    elif args.command == 'playlists-add':
+        qobuz_mod_playlist(user, 'add', args, log)
+
+    elif args.command == 'playlists-del':
+        qobuz_mod_playlist(user, 'del', args, log)
+
+    # elif args.command == 'playlists-set':
+    #     qobuz_mod_playlist(user, 'update', args, log)
+
+
+
 def main():
     ''' Main program entry '''
     #
@@ -511,6 +750,9 @@ def main():
     parser = ArgumentParser(description='Various commands around Qobuz catalog',\
                                      formatter_class=RawDescriptionHelpFormatter)
     parser.add_argument('--log', help='log on file')
+    parser.add_argument('--profile', metavar='PSTATS_FILE', help='Profile the command with cProfile, write stats to PSTATS_FILE and display time by stage')
+    parser.add_argument('--profile-memory', action='store_true', help='Trace memory allocations with tracemalloc, display peak memory and top allocation sites by stage. A snapshot is taken at each stage boundary (each qobuz request, each cover downloaded), which slows down the command')
+    parser.add_argument('--profile-top', metavar='N', type=int, default=10, help='Number of allocation sites displayed by stage. (default=%(default)s)')
 
     # create subparsers
     subparsers = parser.add_subparsers(help=': availables commands', dest='command')
@@ -624,35 +866,23 @@ def main():
     log = logging.getLogger()
     log.info('myqobuz start')
 
-    # register qobuz app
-    qobuz.api.register_app(MYCONFIG['login']['app_id'], MYCONFIG['login']['app_secret'])
-
-    # prepare qobuz authentification
-    log.info('login...')
-    user = qobuz.User(MYCONFIG['login']['email'], MYCONFIG['login']['password'])
-    log.info('... done')
-
-
-    if args.command == 'favorites':
-        qobuz_myfavorites(user, args, log)
-
-    elif args.command == 'favorites-add':
-        qobuz_mod_favorites(user, 'add', args, log)
-
-    elif args.command == 'favorites-del':
-        qobuz_mod_favorites(user, 'del', args, log)
-
-    elif args.command == 'playlists':
-        qobuz_myplaylists(user, args, log)
-
-    elif args.command == 'playlists-add':
-        qobuz_mod_playlist(user, 'add', args, log)
-
-    elif args.command == 'playlists-del':
-        qobuz_mod_playlist(user, 'del', args, log)
-
-    # elif args.command == 'playlists-set':
-    #     qobuz_mod_playlist(user, 'update', args, log)
+    profile = None
+    if args.profile:
+        profile = cProfile.Profile()
+    if args.profile or args.profile_memory:
+        PROFILER.start(trace_memory=args.profile_memory, profile=profile)
+    if profile:
+        profile.enable()
+    try:
+        run_command(args, log)
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(args.profile)
+            log.info('profile stats written to "%s"', args.profile)
+            print('Profile stats written to "{}"'.format(args.profile), file=sys.stderr)
+        if PROFILER.enabled:
+            PROFILER.report(top=args.profile_top)
 
     log.info('myqobuz end')
 